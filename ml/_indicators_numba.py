@@ -0,0 +1,269 @@
+"""
+Numba-compiled technical indicators.
+
+Computes the full indicator set used by ``add_technical_indicators`` with a
+single per-bar kernel, ``step``, shared by the batch and streaming paths.
+The running state (smoothed averages, Welford moments, window sums and the
+recent Close/Volume history) lives in caller-owned arrays, so a batch pass
+leaves the state ready for incremental updates. Results match the ``ta``
+library definitions (Wilder RSI, adjust=False EMAs, population std for
+Bollinger Bands, sample std for volatility).
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - exercised only without numba
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for ``numba.njit`` when numba is not installed."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+# Output column order of compute_all
+INDICATOR_COLUMNS = [
+    'RSI', 'MACD', 'MACD_Signal', 'MACD_Hist',
+    'BB_Upper', 'BB_Middle', 'BB_Lower', 'BB_Width',
+    'SMA_20', 'SMA_50', 'SMA_200', 'EMA_12', 'EMA_26',
+    'Daily_Return', 'Volatility', 'Volume_SMA', 'Volume_Ratio',
+    'Momentum_5', 'Momentum_10', 'Momentum_20',
+    'Price_SMA20_Ratio', 'Price_SMA50_Ratio'
+]
+
+RSI_WINDOW = 14
+EMA_FAST = 12
+EMA_SLOW = 26
+MACD_SIGNAL = 9
+BB_WINDOW = 20
+BB_DEV = 2.0
+VOLATILITY_WINDOW = 20
+VOLUME_WINDOW = 20
+
+# Slots of the running state vector
+COUNT = 0
+AVG_GAIN = 1
+AVG_LOSS = 2
+EMA_FAST_VALUE = 3
+EMA_SLOW_VALUE = 4
+EMA_SIGNAL_VALUE = 5
+SIGNAL_COUNT = 6
+BB_MEAN = 7
+BB_M2 = 8
+RET_MEAN = 9
+RET_M2 = 10
+SUM_50 = 11
+SUM_200 = 12
+VOLUME_SUM = 13
+STATE_SIZE = 14
+
+# Ring buffer lengths: SMA_200 drops close[i - 200]; volume needs volume[i - 20]
+CLOSE_HISTORY = 201
+VOLUME_HISTORY = VOLUME_WINDOW
+
+
+# Explicit signatures: compiled (or loaded from the on-disk cache) at import
+@njit(
+    'void(float64, float64, float64[::1], float64[::1], float64[::1], float64[::1])',
+    cache=True, nogil=True, error_model='numpy'
+)
+def step(x, v, state, closes, volumes, row):
+    """
+    Advance the running state by one bar and write its indicators to ``row``.
+
+    Args:
+        x: Closing price of the new bar
+        v: Traded volume of the new bar
+        state: Running state vector of length STATE_SIZE, updated in place
+        closes: Ring buffer of the last CLOSE_HISTORY closes, updated in place
+        volumes: Ring buffer of the last VOLUME_HISTORY volumes, updated in place
+        row: Output array of length len(INDICATOR_COLUMNS)
+    """
+    i = int(state[COUNT])
+    nan = np.nan
+
+    rsi_alpha = 1.0 / RSI_WINDOW
+    fast_alpha = 2.0 / (EMA_FAST + 1)
+    slow_alpha = 2.0 / (EMA_SLOW + 1)
+    sign_alpha = 2.0 / (MACD_SIGNAL + 1)
+
+    prev = closes[(i - 1) % CLOSE_HISTORY]
+
+    # RSI (Wilder smoothing); the undefined first diff counts as zero
+    if i == 0:
+        avg_gain = 0.0
+        avg_loss = 0.0
+    else:
+        d = x - prev
+        gain = d if d > 0 else 0.0
+        loss = -d if d < 0 else 0.0
+        avg_gain = rsi_alpha * gain + (1.0 - rsi_alpha) * state[AVG_GAIN]
+        avg_loss = rsi_alpha * loss + (1.0 - rsi_alpha) * state[AVG_LOSS]
+    state[AVG_GAIN] = avg_gain
+    state[AVG_LOSS] = avg_loss
+    if i < RSI_WINDOW - 1:
+        row[0] = nan
+    elif avg_loss == 0:
+        row[0] = 100.0
+    else:
+        row[0] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+    # EMAs and MACD
+    if i == 0:
+        ema_fast = x
+        ema_slow = x
+    else:
+        ema_fast = fast_alpha * x + (1.0 - fast_alpha) * state[EMA_FAST_VALUE]
+        ema_slow = slow_alpha * x + (1.0 - slow_alpha) * state[EMA_SLOW_VALUE]
+    state[EMA_FAST_VALUE] = ema_fast
+    state[EMA_SLOW_VALUE] = ema_slow
+    row[11] = ema_fast if i >= EMA_FAST - 1 else nan
+    row[12] = ema_slow if i >= EMA_SLOW - 1 else nan
+
+    if i >= EMA_SLOW - 1:
+        macd = ema_fast - ema_slow
+        sign_count = int(state[SIGNAL_COUNT])
+        if sign_count == 0:
+            ema_sign = macd
+        else:
+            ema_sign = sign_alpha * macd + (1.0 - sign_alpha) * state[EMA_SIGNAL_VALUE]
+        sign_count += 1
+        state[EMA_SIGNAL_VALUE] = ema_sign
+        state[SIGNAL_COUNT] = sign_count
+        row[1] = macd
+        if sign_count >= MACD_SIGNAL:
+            row[2] = ema_sign
+            row[3] = macd - ema_sign
+        else:
+            row[2] = nan
+            row[3] = nan
+    else:
+        row[1] = nan
+        row[2] = nan
+        row[3] = nan
+
+    # Bollinger Bands / SMA_20 (windowed Welford)
+    bb_mean = state[BB_MEAN]
+    bb_m2 = state[BB_M2]
+    if i < BB_WINDOW:
+        delta = x - bb_mean
+        bb_mean += delta / (i + 1)
+        bb_m2 += delta * (x - bb_mean)
+    else:
+        old = closes[(i - BB_WINDOW) % CLOSE_HISTORY]
+        new_mean = bb_mean + (x - old) / BB_WINDOW
+        bb_m2 += (x - old) * (x - new_mean + old - bb_mean)
+        bb_mean = new_mean
+    if bb_m2 < 0:
+        bb_m2 = 0.0
+    state[BB_MEAN] = bb_mean
+    state[BB_M2] = bb_m2
+    if i >= BB_WINDOW - 1:
+        bb_std = np.sqrt(bb_m2 / BB_WINDOW)
+        upper = bb_mean + BB_DEV * bb_std
+        lower = bb_mean - BB_DEV * bb_std
+        row[4] = upper
+        row[5] = bb_mean
+        row[6] = lower
+        row[7] = (upper - lower) / bb_mean
+        row[8] = bb_mean
+        row[20] = x / bb_mean
+    else:
+        for k in (4, 5, 6, 7, 8, 20):
+            row[k] = nan
+
+    # SMA_50 / SMA_200 (running sums)
+    sum_50 = state[SUM_50] + x
+    if i >= 50:
+        sum_50 -= closes[(i - 50) % CLOSE_HISTORY]
+    sum_200 = state[SUM_200] + x
+    if i >= 200:
+        sum_200 -= closes[(i - 200) % CLOSE_HISTORY]
+    state[SUM_50] = sum_50
+    state[SUM_200] = sum_200
+    if i >= 49:
+        sma_50 = sum_50 / 50
+        row[9] = sma_50
+        row[21] = x / sma_50
+    else:
+        row[9] = nan
+        row[21] = nan
+    row[10] = sum_200 / 200 if i >= 199 else nan
+
+    # Daily return and its rolling sample std
+    if i == 0:
+        row[13] = nan
+        row[14] = nan
+    else:
+        r = x / prev - 1.0
+        row[13] = r
+        ret_mean = state[RET_MEAN]
+        ret_m2 = state[RET_M2]
+        if i <= VOLATILITY_WINDOW:
+            delta = r - ret_mean
+            ret_mean += delta / i
+            ret_m2 += delta * (r - ret_mean)
+        else:
+            old = (
+                closes[(i - VOLATILITY_WINDOW) % CLOSE_HISTORY]
+                / closes[(i - VOLATILITY_WINDOW - 1) % CLOSE_HISTORY] - 1.0
+            )
+            new_mean = ret_mean + (r - old) / VOLATILITY_WINDOW
+            ret_m2 += (r - old) * (r - new_mean + old - ret_mean)
+            ret_mean = new_mean
+        if ret_m2 < 0:
+            ret_m2 = 0.0
+        state[RET_MEAN] = ret_mean
+        state[RET_M2] = ret_m2
+        if i >= VOLATILITY_WINDOW:
+            row[14] = np.sqrt(ret_m2 / (VOLATILITY_WINDOW - 1))
+        else:
+            row[14] = nan
+
+    # Volume SMA and ratio; slot i % VOLUME_HISTORY still holds volume[i - 20]
+    vol_slot = i % VOLUME_HISTORY
+    vol_sum = state[VOLUME_SUM] + v
+    if i >= VOLUME_WINDOW:
+        vol_sum -= volumes[vol_slot]
+    state[VOLUME_SUM] = vol_sum
+    if i >= VOLUME_WINDOW - 1:
+        vol_sma = vol_sum / VOLUME_WINDOW
+        row[15] = vol_sma
+        row[16] = v / vol_sma
+    else:
+        row[15] = nan
+        row[16] = nan
+
+    # Price momentum
+    row[17] = x / closes[(i - 5) % CLOSE_HISTORY] - 1.0 if i >= 5 else nan
+    row[18] = x / closes[(i - 10) % CLOSE_HISTORY] - 1.0 if i >= 10 else nan
+    row[19] = x / closes[(i - 20) % CLOSE_HISTORY] - 1.0 if i >= 20 else nan
+
+    closes[i % CLOSE_HISTORY] = x
+    volumes[vol_slot] = v
+    state[COUNT] = i + 1
+
+
+@njit(
+    'void(float64[::1], float64[::1], float64[:, ::1], float64[::1], float64[::1], float64[::1])',
+    cache=True, nogil=True, error_model='numpy'
+)
+def compute_all(close, volume, out, state, closes, volumes):
+    """
+    Fill ``out`` (N, len(INDICATOR_COLUMNS)) with all indicators.
+
+    Continues from the given running state (zeroed arrays start a fresh
+    series) and leaves it positioned after the last bar.
+
+    Args:
+        close: Closing prices, float64 of length N
+        volume: Traded volume, float64 of length N
+        out: Preallocated float64 output array
+        state, closes, volumes: Running state arrays, updated in place
+    """
+    for i in range(close.shape[0]):
+        step(close[i], volume[i], state, closes, volumes, out[i])
@@ -0,0 +1,25 @@
+"""
+Serializable MinMaxScaler parameters.
+
+Kept free of sklearn and the data stack so deployment tooling can write
+scaler_params.json without importing the training dependencies.
+"""
+
+import numpy as np
+from typing import Any, Dict
+
+
+def scaler_to_params(scaler: Any) -> Dict[str, np.ndarray]:
+    """
+    Extract fitted MinMaxScaler parameters as float32 arrays.
+
+    orjson serializes float32 arrays with their shortest round-trip repr,
+    which keeps scaler_params.json small.
+    """
+    return {
+        'min_': np.asarray(scaler.min_, dtype=np.float32),
+        'scale_': np.asarray(scaler.scale_, dtype=np.float32),
+        'data_min_': np.asarray(scaler.data_min_, dtype=np.float32),
+        'data_max_': np.asarray(scaler.data_max_, dtype=np.float32),
+        'data_range_': np.asarray(scaler.data_range_, dtype=np.float32),
+    }
@@ -4,64 +4,203 @@ Handles feature engineering, normalization, and sequence creation.
 """
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
 import ta
-from typing import Tuple, Dict, Any
+import os
+import re
+import joblib
+import orjson
+from joblib import Parallel, delayed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Tuple, Dict, Any, Optional, List
 import yfinance as yf
 
+from _indicators_numba import (
+    NUMBA_AVAILABLE, INDICATOR_COLUMNS, compute_all, step,
+    COUNT, STATE_SIZE, CLOSE_HISTORY, VOLUME_HISTORY
+)
+from _scaler_params import scaler_to_params
+
+
+CACHE_DIR = Path.home() / '.cache' / 'stock-predictor'
+
+# Leading rows with indicator warm-up NaNs; SMA_50 is the longest window
+# among the model features (SMA_200 is computed but not used as a feature)
+WARMUP = 50 - 1
+
+
+def fetch_stock_data(
+    symbol: str,
+    period: str = "2y",
+    use_cache: bool = True,
+    cache_dir: Optional[Path] = None
+) -> pd.DataFrame:
+    """
+    Fetch historical stock data from Yahoo Finance.
+
+    Results are cached as parquet, keyed on symbol, period and the most
+    recent trading day, so repeated runs skip the network until a new
+    trading day has started.
+    """
+    cache_dir = Path(cache_dir) if cache_dir is not None else CACHE_DIR
+    last_trading_day = pd.offsets.BDay().rollback(pd.Timestamp.today().normalize())
+    stem = f"{re.sub(r'[^A-Za-z0-9._-]', '_', symbol.upper())}_{period}"
+    cache_path = cache_dir / f"{stem}_{last_trading_day:%Y%m%d}.parquet"
+
+    if use_cache and cache_path.exists():
+        return pd.read_parquet(cache_path, engine='pyarrow')
 
-def fetch_stock_data(symbol: str, period: str = "2y") -> pd.DataFrame:
-    """Fetch historical stock data from Yahoo Finance."""
     ticker = yf.Ticker(symbol)
     df = ticker.history(period=period)
     df.reset_index(inplace=True)
+
+    if use_cache and not df.empty:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # Drop entries from earlier trading days
+        for stale in cache_dir.glob(f"{stem}_*.parquet"):
+            stale.unlink(missing_ok=True)
+        df.to_parquet(cache_path, engine='pyarrow')
+
     return df
 
 
-def add_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
-    """Add technical indicators to the dataframe."""
-    df = df.copy()
+def add_technical_indicators(
+    df: pd.DataFrame,
+    state: Optional['IndicatorState'] = None
+) -> pd.DataFrame:
+    """
+    Add technical indicators to the dataframe.
+
+    Args:
+        df: OHLCV dataframe
+        state: Optional running indicator state. df is treated as the
+            continuation of the bars already in the state, which is left
+            positioned after df's last row.
+    """
+    if state is None:
+        if not NUMBA_AVAILABLE:
+            return _add_technical_indicators_ta(df)
+        state = IndicatorState()
+
+    out = state.advance(df['Close'].to_numpy(), df['Volume'].to_numpy())
+
+    indicators = pd.DataFrame(out, index=df.index, columns=INDICATOR_COLUMNS)
+    return pd.concat([df.drop(columns=INDICATOR_COLUMNS, errors='ignore'), indicators], axis=1)
+
+
+def _add_technical_indicators_ta(df: pd.DataFrame) -> pd.DataFrame:
+    """Add technical indicators using the ta library (fallback without numba)."""
+    close = df['Close']
+    volume = df['Volume']
+    new_cols = {}
 
     # RSI
-    df['RSI'] = ta.momentum.RSIIndicator(df['Close'], window=14).rsi()
+    new_cols['RSI'] = ta.momentum.RSIIndicator(close, window=14).rsi()
 
     # MACD
-    macd = ta.trend.MACD(df['Close'])
-    df['MACD'] = macd.macd()
-    df['MACD_Signal'] = macd.macd_signal()
-    df['MACD_Hist'] = macd.macd_diff()
+    macd = ta.trend.MACD(close)
+    new_cols['MACD'] = macd.macd()
+    new_cols['MACD_Signal'] = macd.macd_signal()
+    new_cols['MACD_Hist'] = macd.macd_diff()
 
     # Bollinger Bands
-    bollinger = ta.volatility.BollingerBands(df['Close'], window=20)
-    df['BB_Upper'] = bollinger.bollinger_hband()
-    df['BB_Middle'] = bollinger.bollinger_mavg()
-    df['BB_Lower'] = bollinger.bollinger_lband()
-    df['BB_Width'] = (df['BB_Upper'] - df['BB_Lower']) / df['BB_Middle']
+    bollinger = ta.volatility.BollingerBands(close, window=20)
+    new_cols['BB_Upper'] = bollinger.bollinger_hband()
+    new_cols['BB_Middle'] = bollinger.bollinger_mavg()
+    new_cols['BB_Lower'] = bollinger.bollinger_lband()
+    new_cols['BB_Width'] = (new_cols['BB_Upper'] - new_cols['BB_Lower']) / new_cols['BB_Middle']
 
     # Moving Averages
-    df['SMA_20'] = ta.trend.SMAIndicator(df['Close'], window=20).sma_indicator()
-    df['SMA_50'] = ta.trend.SMAIndicator(df['Close'], window=50).sma_indicator()
-    df['SMA_200'] = ta.trend.SMAIndicator(df['Close'], window=200).sma_indicator()
-    df['EMA_12'] = ta.trend.EMAIndicator(df['Close'], window=12).ema_indicator()
-    df['EMA_26'] = ta.trend.EMAIndicator(df['Close'], window=26).ema_indicator()
+    new_cols['SMA_20'] = ta.trend.SMAIndicator(close, window=20).sma_indicator()
+    new_cols['SMA_50'] = ta.trend.SMAIndicator(close, window=50).sma_indicator()
+    new_cols['SMA_200'] = ta.trend.SMAIndicator(close, window=200).sma_indicator()
+    new_cols['EMA_12'] = ta.trend.EMAIndicator(close, window=12).ema_indicator()
+    new_cols['EMA_26'] = ta.trend.EMAIndicator(close, window=26).ema_indicator()
 
     # Additional features
-    df['Daily_Return'] = df['Close'].pct_change()
-    df['Volatility'] = df['Daily_Return'].rolling(window=20).std()
-    df['Volume_SMA'] = df['Volume'].rolling(window=20).mean()
-    df['Volume_Ratio'] = df['Volume'] / df['Volume_SMA']
+    new_cols['Daily_Return'] = close.pct_change()
+    new_cols['Volatility'] = new_cols['Daily_Return'].rolling(window=20).std()
+    new_cols['Volume_SMA'] = volume.rolling(window=20).mean()
+    new_cols['Volume_Ratio'] = volume / new_cols['Volume_SMA']
 
     # Price momentum
-    df['Momentum_5'] = df['Close'] / df['Close'].shift(5) - 1
-    df['Momentum_10'] = df['Close'] / df['Close'].shift(10) - 1
-    df['Momentum_20'] = df['Close'] / df['Close'].shift(20) - 1
+    new_cols['Momentum_5'] = close / close.shift(5) - 1
+    new_cols['Momentum_10'] = close / close.shift(10) - 1
+    new_cols['Momentum_20'] = close / close.shift(20) - 1
 
     # Price position relative to MAs
-    df['Price_SMA20_Ratio'] = df['Close'] / df['SMA_20']
-    df['Price_SMA50_Ratio'] = df['Close'] / df['SMA_50']
+    new_cols['Price_SMA20_Ratio'] = close / new_cols['SMA_20']
+    new_cols['Price_SMA50_Ratio'] = close / new_cols['SMA_50']
 
-    return df
+    # Single concat instead of one block insertion per column
+    indicators = pd.DataFrame(new_cols, index=df.index)
+    return pd.concat([df.drop(columns=INDICATOR_COLUMNS, errors='ignore'), indicators], axis=1)
+
+
+@dataclass
+class IndicatorState:
+    """
+    Running state for streaming technical indicator updates.
+
+    Holds the arrays advanced in place by the compiled per-bar kernel
+    (_indicators_numba.step), so batch and streaming results are identical.
+    """
+    values: np.ndarray = field(default_factory=lambda: np.zeros(STATE_SIZE))
+    closes: np.ndarray = field(default_factory=lambda: np.zeros(CLOSE_HISTORY))
+    volumes: np.ndarray = field(default_factory=lambda: np.zeros(VOLUME_HISTORY))
+
+    @property
+    def count(self) -> int:
+        """Number of bars consumed so far."""
+        return int(self.values[COUNT])
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame) -> 'IndicatorState':
+        """Build the state by streaming an existing OHLCV history."""
+        state = cls()
+        state.advance(df['Close'].to_numpy(), df['Volume'].to_numpy())
+        return state
+
+    def advance(self, close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+        """Consume a block of bars, returning their (N, F) indicator values."""
+        # The kernel signatures require writable C-contiguous float64 arrays;
+        # pandas may hand back read-only views, which np.require copies
+        close = np.require(close, dtype=np.float64, requirements=['C', 'W'])
+        volume = np.require(volume, dtype=np.float64, requirements=['C', 'W'])
+        out = np.empty((len(close), len(INDICATOR_COLUMNS)), dtype=np.float64)
+        compute_all(close, volume, out, self.values, self.closes, self.volumes)
+        return out
+
+    def update(self, close: float, volume: float) -> np.ndarray:
+        """
+        Advance the state by one bar in O(1).
+
+        Returns the indicator values for the new bar in INDICATOR_COLUMNS order.
+        """
+        row = np.empty(len(INDICATOR_COLUMNS), dtype=np.float64)
+        step(float(close), float(volume), self.values, self.closes, self.volumes, row)
+        return row
+
+
+def add_technical_indicators_incremental(
+    state: IndicatorState,
+    new_row: pd.Series
+) -> pd.Series:
+    """
+    Compute technical indicators for a single new bar.
+
+    Args:
+        state: Running indicator state, updated in place
+        new_row: OHLCV row for the new bar
+
+    Returns:
+        Indicator values for the new bar
+    """
+    values = state.update(float(new_row['Close']), float(new_row['Volume']))
+    return pd.Series(values, index=INDICATOR_COLUMNS, name=new_row.name)
 
 
 def prepare_features(df: pd.DataFrame) -> Tuple[np.ndarray, list]:
@@ -79,10 +218,16 @@ def prepare_features(df: pd.DataFrame) -> Tuple[np.ndarray, list]:
     # Filter columns that exist
     available_columns = [col for col in feature_columns if col in df.columns]
 
-    # Drop rows with NaN values
-    df_clean = df[available_columns].dropna()
+    # Skip the indicator warm-up rows instead of scanning the frame with dropna;
+    # float32 is ample for OHLCV features and halves memory traffic downstream
+    features = df[available_columns].iloc[WARMUP:].to_numpy(dtype=np.float32)
 
-    return df_clean.values, available_columns
+    # Safety fallback: drop any rows that still contain NaN (e.g. missing quotes)
+    nan_rows = np.isnan(features).any(axis=1)
+    if nan_rows.any():
+        features = features[~nan_rows]
+
+    return features, available_columns
 
 
 def create_sequences(
@@ -99,17 +244,24 @@ def create_sequences(
         prediction_horizon: Number of days to predict ahead
 
     Returns:
-        X: Input sequences
+        X: Input sequences (read-only view into data)
         y: Target values (closing price)
     """
-    X, y = [], []
+    n_windows = len(data) - sequence_length - prediction_horizon + 1
+    if n_windows <= 0:
+        return (
+            np.empty((0, sequence_length, data.shape[1]), dtype=data.dtype),
+            np.empty(0, dtype=data.dtype)
+        )
+
+    # Zero-copy view of every window: (n, features, steps) -> (n, steps, features)
+    windows = sliding_window_view(data, window_shape=sequence_length, axis=0)
+    X = windows.transpose(0, 2, 1)[:n_windows]
 
-    for i in range(sequence_length, len(data) - prediction_horizon + 1):
-        X.append(data[i - sequence_length:i])
-        # Target is the closing price (index 3) at prediction_horizon days ahead
-        y.append(data[i + prediction_horizon - 1, 3])
+    # Target is the closing price (index 3) at prediction_horizon days ahead
+    y = data[sequence_length + prediction_horizon - 1:, 3]
 
-    return np.array(X), np.array(y)
+    return X, y
 
 
 def prepare_xgboost_features(
@@ -131,22 +283,29 @@ def prepare_xgboost_features(
         y: Target values
         new_feature_names: Names of the flattened features
     """
-    X, y = [], []
-    new_feature_names = []
-
     # Create feature names for flattened data
-    for day in range(lookback):
-        for name in feature_names:
-            new_feature_names.append(f"{name}_t-{lookback-day}")
+    new_feature_names = [
+        f"{name}_t-{lookback-day}"
+        for day in range(lookback)
+        for name in feature_names
+    ]
 
-    for i in range(lookback, len(data) - 1):
-        # Flatten the lookback window
-        features = data[i - lookback:i].flatten()
-        X.append(features)
-        # Target is next day's close
-        y.append(data[i, 3])  # Index 3 is Close
+    n_samples = len(data) - lookback - 1
+    if n_samples <= 0:
+        return (
+            np.empty((0, lookback * data.shape[1]), dtype=data.dtype),
+            np.empty(0, dtype=data.dtype),
+            new_feature_names
+        )
+
+    # Flatten each lookback window in a single reshape
+    windows = sliding_window_view(data, window_shape=lookback, axis=0)[:n_samples]
+    X = windows.transpose(0, 2, 1).reshape(n_samples, lookback * data.shape[1])
+
+    # Target is next day's close
+    y = data[lookback:-1, 3]  # Index 3 is Close
 
-    return np.array(X), np.array(y), new_feature_names
+    return X, y, new_feature_names
 
 
 class DataPipeline:
@@ -156,6 +315,47 @@ class DataPipeline:
         self.price_scaler = MinMaxScaler()
         self.feature_scaler = MinMaxScaler()
         self.feature_columns = None
+        self._scale: Optional[np.ndarray] = None
+        self._min: Optional[np.ndarray] = None
+        self._indicator_df: Optional[pd.DataFrame] = None
+        self._indicator_state: Optional[IndicatorState] = None
+        self._cached_features: Optional[np.ndarray] = None
+        # Last max(sequence_length, lookback) scaled rows, updated in place by update()
+        self._feature_window: Optional[np.ndarray] = None
+        self._window_size = 0
+
+    def _add_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add technical indicators, reusing the previous result when df only
+        appends new rows to the last frame seen by this pipeline.
+        """
+        cached = self._indicator_df
+        n_cached = 0 if cached is None else len(cached)
+
+        # Cached frames hold the input columns first, then the indicators;
+        # reuse requires those input columns to match row for row
+        base = df.drop(columns=INDICATOR_COLUMNS, errors='ignore')
+        n_base = base.shape[1]
+        is_extension = (
+            n_cached > 0
+            and self._indicator_state is not None
+            and len(df) >= n_cached
+            and list(cached.columns[:n_base]) == list(base.columns)
+            and base.iloc[:n_cached].equals(cached.iloc[:, :n_base])
+        )
+
+        if not is_extension:
+            # One compiled pass computes the indicators and seeds the state
+            self._indicator_state = IndicatorState()
+            result = add_technical_indicators(df, self._indicator_state)
+        elif len(df) == n_cached:
+            return cached
+        else:
+            tail = add_technical_indicators(df.iloc[n_cached:], self._indicator_state)
+            result = pd.concat([cached, tail])
+
+        self._indicator_df = result
+        return result
 
     def fit_transform(
         self,
@@ -168,13 +368,17 @@ class DataPipeline:
         Returns dict with LSTM and XGBoost ready data.
         """
         # Add technical indicators
-        df = add_technical_indicators(df)
+        df = self._add_indicators(df)
 
         # Prepare features
         features, self.feature_columns = prepare_features(df)
 
         # Scale features
         features_scaled = self.feature_scaler.fit_transform(features)
+        self._scale = self.feature_scaler.scale_.astype(np.float32)
+        self._min = self.feature_scaler.min_.astype(np.float32)
+        self._cached_features = features_scaled
+        self._feature_window = None
 
         # Create LSTM sequences
         X_lstm, y_lstm = create_sequences(features_scaled, sequence_length)
@@ -206,21 +410,64 @@ class DataPipeline:
             }
         }
 
-    def inverse_scale_price(self, scaled_prices: np.ndarray) -> np.ndarray:
-        """Inverse scale the price values."""
-        # Create a dummy array with same shape as original features
+    def _scale_features(self, features: np.ndarray) -> np.ndarray:
+        """Apply the fitted MinMax scaling without sklearn's per-call validation."""
+        if self._scale is None or self._min is None:
+            return self.feature_scaler.transform(features)
+        return features.astype(np.float32, copy=False) * self._scale + self._min
+
+    def inverse_scale_price(
+        self,
+        scaled_prices: np.ndarray,
+        out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Inverse scale the price values.
+
+        Args:
+            scaled_prices: Scaled Close prices
+            out: Optional preallocated float64 array to write the result into
+        """
+        if isinstance(self.feature_scaler, MinMaxScaler):
+            # Undo MinMax scaling on the Close column (index 3) only
+            scaled_prices = np.asarray(scaled_prices)
+            out = np.subtract(scaled_prices, self.feature_scaler.min_[3], out=out)
+            return np.divide(out, self.feature_scaler.scale_[3], out=out)
+
+        # Generic scalers: round-trip through a dummy full-width array
         dummy = np.zeros((len(scaled_prices), len(self.feature_columns)))
         dummy[:, 3] = scaled_prices  # Close price is at index 3
 
         # Inverse transform
         inversed = self.feature_scaler.inverse_transform(dummy)
-        return inversed[:, 3]
+        if out is None:
+            return inversed[:, 3]
+        out[:] = inversed[:, 3]
+        return out
+
+    def save_scaler(self, output_dir: str):
+        """
+        Save the fitted feature scaler.
+
+        Writes feature_scaler.joblib for Python and scaler_params.json for
+        the web app, so deployment does not need to unpickle the scaler.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        joblib.dump(self.feature_scaler, os.path.join(output_dir, 'feature_scaler.joblib'))
+
+        with open(os.path.join(output_dir, 'scaler_params.json'), 'wb') as f:
+            f.write(orjson.dumps(
+                scaler_to_params(self.feature_scaler),
+                option=orjson.OPT_SERIALIZE_NUMPY
+            ))
 
     def transform(self, df: pd.DataFrame, sequence_length: int = 60) -> Dict[str, Any]:
         """Transform new data using fitted scalers."""
-        df = add_technical_indicators(df)
+        df = self._add_indicators(df)
         features, _ = prepare_features(df)
-        features_scaled = self.feature_scaler.transform(features)
+        features_scaled = self._scale_features(features)
+        self._cached_features = features_scaled
+        self._feature_window = None
 
         X_lstm, _ = create_sequences(features_scaled, sequence_length)
         X_xgb, _, _ = prepare_xgboost_features(
@@ -232,6 +479,116 @@ class DataPipeline:
             'xgboost': {'X': X_xgb}
         }
 
+    def update(
+        self,
+        new_ohlcv_row: pd.Series,
+        sequence_length: int = 60,
+        lookback: int = 5
+    ) -> Dict[str, Any]:
+        """
+        Append one new bar and return model inputs ending at that bar.
+
+        Only the new bar's indicators are computed (O(1) via the streaming
+        indicator state) and one scaled row is shifted into a fixed-size
+        window of recent features, instead of re-running the full pipeline
+        on the history. The window is seeded from the features of the last
+        fit_transform() or transform() call.
+
+        Args:
+            new_ohlcv_row: Row with Open, High, Low, Close and Volume
+            sequence_length: Number of time steps for the LSTM window
+            lookback: Number of days flattened for XGBoost
+
+        Returns:
+            Dict with the latest LSTM window (1, sequence_length, F) and
+            XGBoost vector (1, lookback * F)
+        """
+        if self._indicator_state is None or self._cached_features is None:
+            raise ValueError("Pipeline not initialized. Call fit_transform() or transform() first.")
+
+        indicators = self._indicator_state.update(
+            float(new_ohlcv_row['Close']), float(new_ohlcv_row['Volume'])
+        )
+        # The cached indicator frame no longer matches the streaming state
+        self._indicator_df = None
+
+        row = np.array([
+            indicators[INDICATOR_COLUMNS.index(col)] if col in INDICATOR_COLUMNS
+            else new_ohlcv_row[col]
+            for col in self.feature_columns
+        ], dtype=np.float32)
+
+        window = max(sequence_length, lookback)
+        if self._feature_window is None:
+            self._feature_window = self._cached_features[-window:].copy()
+            self._window_size = window
+        elif window > self._window_size:
+            raise ValueError("Window size grew after streaming started; call transform() first.")
+        features = self._feature_window
+
+        # Rows still inside the indicator warm-up are skipped, as in prepare_features
+        if not np.isnan(row).any():
+            scaled = self._scale_features(row[np.newaxis, :])
+            if len(features) < self._window_size:
+                # Only while the history is still shorter than the window
+                features = np.concatenate([features, scaled])
+            else:
+                features[:-1] = features[1:]
+                features[-1] = scaled[0]
+        self._feature_window = features
+
+        if len(features) < window:
+            raise ValueError("Not enough history to build model inputs.")
+
+        # Copies, since the window is overwritten by the next update
+        return {
+            'lstm': {'X': features[np.newaxis, -sequence_length:].copy()},
+            'xgboost': {'X': features[-lookback:].reshape(1, -1).copy()}
+        }
+
+
+def _process_one(
+    symbol: str,
+    period: str,
+    sequence_length: int,
+    use_cache: bool
+) -> Tuple['DataPipeline', Dict[str, Any]]:
+    """Fetch and preprocess a single symbol with its own pipeline."""
+    pipeline = DataPipeline()
+    df = fetch_stock_data(symbol, period, use_cache=use_cache)
+    return pipeline, pipeline.fit_transform(df, sequence_length)
+
+
+def fit_transform_many(
+    symbols: List[str],
+    period: str = "2y",
+    sequence_length: int = 60,
+    use_cache: bool = True,
+    n_jobs: int = -1,
+    backend: str = 'loky'
+) -> Dict[str, Tuple[DataPipeline, Dict[str, Any]]]:
+    """
+    Fetch and preprocess several symbols in parallel.
+
+    Pipelines share no state, so each symbol runs as an independent job.
+
+    Args:
+        symbols: Stock symbols to process
+        period: Historical data period
+        sequence_length: Sequence length for LSTM
+        use_cache: Reuse locally cached price history when available
+        n_jobs: Number of parallel jobs (-1 uses all cores)
+        backend: joblib backend ('loky' for processes, 'threading' for threads)
+
+    Returns:
+        Dict mapping each symbol to its fitted pipeline and fit_transform output
+    """
+    results = Parallel(n_jobs=n_jobs, backend=backend)(
+        delayed(_process_one)(symbol, period, sequence_length, use_cache)
+        for symbol in symbols
+    )
+    return dict(zip(symbols, results))
+
 
 if __name__ == "__main__":
     # Test the pipeline
@@ -5,23 +5,38 @@ Export trained models to TensorFlow.js format.
 import os
 import sys
 import argparse
-import json
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import tensorflow as tf
 import tensorflowjs as tfjs
-import joblib
+import orjson
 
+from _scaler_params import scaler_to_params
+from models.lstm_model import to_float32_model, TFLITE_INT8_FILENAME
 
-def export_lstm_to_tfjs(model_path: str, output_dir: str):
+
+# Weight quantization modes for the TensorFlow.js converter
+QUANTIZATION_DTYPE_MAPS = {
+    'none': None,
+    'fp16': {'float16': '*'},
+    'int8': {'uint8': '*'},
+}
+
+_keras_lock = threading.Lock()
+
+
+def export_lstm_to_tfjs(model_path: str, output_dir: str, quantize: str = 'fp16'):
     """
     Export a Keras LSTM model to TensorFlow.js format.
 
     Args:
         model_path: Path to the saved Keras model (.keras or SavedModel)
         output_dir: Directory to save the TensorFlow.js model
+        quantize: Weight quantization mode ('none', 'fp16' or 'int8')
     """
     print(f"Loading model from {model_path}...")
-    model = tf.keras.models.load_model(model_path)
+    model = to_float32_model(tf.keras.models.load_model(model_path))
 
     print(f"Model summary:")
     model.summary()
@@ -29,7 +44,11 @@ def export_lstm_to_tfjs(model_path: str, output_dir: str):
     print(f"\nExporting to {output_dir}...")
     os.makedirs(output_dir, exist_ok=True)
 
-    tfjs.converters.save_keras_model(model, output_dir)
+    tfjs.converters.save_keras_model(
+        model,
+        output_dir,
+        quantization_dtype_map=QUANTIZATION_DTYPE_MAPS[quantize]
+    )
 
     print(f"Export complete!")
 
@@ -40,7 +59,92 @@ def export_lstm_to_tfjs(model_path: str, output_dir: str):
         print(f"  {f}: {size / 1024:.1f} KB")
 
 
-def prepare_models_for_deployment(trained_dir: str, public_dir: str):
+def _process_symbol(
+    symbol_dir: str,
+    trained_dir: str,
+    public_dir: str,
+    quantize: str = 'fp16'
+) -> list:
+    """
+    Copy or export the deployment artifacts for a single symbol.
+
+    Returns the log lines for the symbol so output from parallel workers
+    is not interleaved.
+    """
+    symbol_path = os.path.join(trained_dir, symbol_dir)
+    log = [f"\nProcessing {symbol_dir}..."]
+
+    target_symbol_dir = os.path.join(public_dir, symbol_dir)
+    os.makedirs(target_symbol_dir, exist_ok=True)
+
+    # Export (quantized) or copy the LSTM TensorFlow.js model
+    lstm_keras_path = os.path.join(symbol_path, 'lstm_model.keras')
+    lstm_tfjs_dir = os.path.join(symbol_path, 'lstm_tfjs')
+    target_lstm = os.path.join(target_symbol_dir, 'lstm')
+    if quantize != 'none' and os.path.exists(lstm_keras_path):
+        if os.path.exists(target_lstm):
+            shutil.rmtree(target_lstm)
+        # Keras model loading is not thread-safe; only file copies overlap
+        with _keras_lock:
+            model = to_float32_model(tf.keras.models.load_model(lstm_keras_path))
+            tfjs.converters.save_keras_model(
+                model,
+                target_lstm,
+                quantization_dtype_map=QUANTIZATION_DTYPE_MAPS[quantize]
+            )
+        tflite_path = os.path.join(lstm_tfjs_dir, TFLITE_INT8_FILENAME)
+        if os.path.exists(tflite_path):
+            shutil.copy(tflite_path, target_lstm)
+        log.append(f"  Exported LSTM model ({quantize})")
+    elif os.path.exists(lstm_tfjs_dir):
+        if os.path.exists(target_lstm):
+            shutil.rmtree(target_lstm)
+        shutil.copytree(lstm_tfjs_dir, target_lstm)
+        log.append(f"  Copied LSTM model")
+
+    # Copy XGBoost JS export
+    xgb_js_dir = os.path.join(symbol_path, 'xgboost_js')
+    if os.path.exists(xgb_js_dir):
+        target_xgb = os.path.join(target_symbol_dir, 'xgboost')
+        if os.path.exists(target_xgb):
+            shutil.rmtree(target_xgb)
+        shutil.copytree(xgb_js_dir, target_xgb)
+        log.append(f"  Copied XGBoost config")
+
+    # Copy ensemble config
+    ensemble_config = os.path.join(symbol_path, 'ensemble_config.json')
+    if os.path.exists(ensemble_config):
+        shutil.copy(ensemble_config, target_symbol_dir)
+        log.append(f"  Copied ensemble config")
+
+    # Copy preprocessing config
+    preprocessing_config = os.path.join(symbol_path, 'preprocessing_config.json')
+    if os.path.exists(preprocessing_config):
+        shutil.copy(preprocessing_config, target_symbol_dir)
+        log.append(f"  Copied preprocessing config")
+
+    # Copy scaler parameters written at training time, or export them
+    # from the pickled scaler for models trained before they existed
+    scaler_params_path = os.path.join(symbol_path, 'scaler_params.json')
+    scaler_path = os.path.join(symbol_path, 'feature_scaler.joblib')
+    if os.path.exists(scaler_params_path):
+        shutil.copy(scaler_params_path, target_symbol_dir)
+        log.append(f"  Copied scaler parameters")
+    elif os.path.exists(scaler_path):
+        # Unpickling the scaler needs joblib and sklearn; import them only
+        # for this legacy fallback
+        import joblib
+        scaler = joblib.load(scaler_path)
+        scaler_params = scaler_to_params(scaler)
+        scaler_json_path = os.path.join(target_symbol_dir, 'scaler_params.json')
+        with open(scaler_json_path, 'wb') as f:
+            f.write(orjson.dumps(scaler_params, option=orjson.OPT_SERIALIZE_NUMPY))
+        log.append(f"  Exported scaler parameters")
+
+    return log
+
+
+def prepare_models_for_deployment(trained_dir: str, public_dir: str, quantize: str = 'fp16'):
     """
     Prepare all trained models for web deployment.
     Copies necessary files to the public/models directory.
@@ -48,6 +152,7 @@ def prepare_models_for_deployment(trained_dir: str, public_dir: str):
     Args:
         trained_dir: Directory containing trained models
         public_dir: Target public directory for the web app
+        quantize: Weight quantization mode for the LSTM ('none', 'fp16' or 'int8')
     """
     print(f"\nPreparing models for deployment...")
     print(f"Source: {trained_dir}")
@@ -56,61 +161,20 @@ def prepare_models_for_deployment(trained_dir: str, public_dir: str):
     os.makedirs(public_dir, exist_ok=True)
 
     # Find all trained model directories
-    for symbol_dir in os.listdir(trained_dir):
-        symbol_path = os.path.join(trained_dir, symbol_dir)
-        if not os.path.isdir(symbol_path):
-            continue
-
-        print(f"\nProcessing {symbol_dir}...")
-
-        target_symbol_dir = os.path.join(public_dir, symbol_dir)
-        os.makedirs(target_symbol_dir, exist_ok=True)
-
-        # Copy LSTM TensorFlow.js model
-        lstm_tfjs_dir = os.path.join(symbol_path, 'lstm_tfjs')
-        if os.path.exists(lstm_tfjs_dir):
-            target_lstm = os.path.join(target_symbol_dir, 'lstm')
-            if os.path.exists(target_lstm):
-                shutil.rmtree(target_lstm)
-            shutil.copytree(lstm_tfjs_dir, target_lstm)
-            print(f"  Copied LSTM model")
-
-        # Copy XGBoost JS export
-        xgb_js_dir = os.path.join(symbol_path, 'xgboost_js')
-        if os.path.exists(xgb_js_dir):
-            target_xgb = os.path.join(target_symbol_dir, 'xgboost')
-            if os.path.exists(target_xgb):
-                shutil.rmtree(target_xgb)
-            shutil.copytree(xgb_js_dir, target_xgb)
-            print(f"  Copied XGBoost config")
-
-        # Copy ensemble config
-        ensemble_config = os.path.join(symbol_path, 'ensemble_config.json')
-        if os.path.exists(ensemble_config):
-            shutil.copy(ensemble_config, target_symbol_dir)
-            print(f"  Copied ensemble config")
-
-        # Copy preprocessing config
-        preprocessing_config = os.path.join(symbol_path, 'preprocessing_config.json')
-        if os.path.exists(preprocessing_config):
-            shutil.copy(preprocessing_config, target_symbol_dir)
-            print(f"  Copied preprocessing config")
-
-        # Export scaler parameters as JSON for JS
-        scaler_path = os.path.join(symbol_path, 'feature_scaler.joblib')
-        if os.path.exists(scaler_path):
-            scaler = joblib.load(scaler_path)
-            scaler_params = {
-                'min_': scaler.min_.tolist(),
-                'scale_': scaler.scale_.tolist(),
-                'data_min_': scaler.data_min_.tolist(),
-                'data_max_': scaler.data_max_.tolist(),
-                'data_range_': scaler.data_range_.tolist(),
-            }
-            scaler_json_path = os.path.join(target_symbol_dir, 'scaler_params.json')
-            with open(scaler_json_path, 'w') as f:
-                json.dump(scaler_params, f)
-            print(f"  Exported scaler parameters")
+    symbol_dirs = [
+        d for d in os.listdir(trained_dir)
+        if os.path.isdir(os.path.join(trained_dir, d))
+    ]
+
+    # Per-symbol work is I/O-bound, so threads overlap the copies
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        logs = executor.map(
+            lambda d: _process_symbol(d, trained_dir, public_dir, quantize),
+            symbol_dirs
+        )
+        for log in logs:
+            print('\n'.join(log))
 
     # Create models index
     models_index = []
@@ -119,8 +183,8 @@ def prepare_models_for_deployment(trained_dir: str, public_dir: str):
         if os.path.isdir(symbol_path):
             config_path = os.path.join(symbol_path, 'preprocessing_config.json')
             if os.path.exists(config_path):
-                with open(config_path) as f:
-                    config = json.load(f)
+                with open(config_path, 'rb') as f:
+                    config = orjson.loads(f.read())
                 models_index.append({
                     'symbol': config.get('symbol', symbol_dir.upper()),
                     'trained_at': config.get('trained_at'),
@@ -128,8 +192,8 @@ def prepare_models_for_deployment(trained_dir: str, public_dir: str):
                 })
 
     index_path = os.path.join(public_dir, 'models_index.json')
-    with open(index_path, 'w') as f:
-        json.dump(models_index, f, indent=2)
+    with open(index_path, 'wb') as f:
+        f.write(orjson.dumps(models_index, option=orjson.OPT_INDENT_2))
 
     print(f"\nCreated models index with {len(models_index)} models")
     print(f"Deployment preparation complete!")
@@ -145,13 +209,15 @@ def main():
                         help='Directory with trained models')
     parser.add_argument('--public-dir', type=str, default='../public/models',
                         help='Public directory for web app')
+    parser.add_argument('--quantize', type=str, choices=sorted(QUANTIZATION_DTYPE_MAPS),
+                        default='fp16', help='LSTM weight quantization')
 
     args = parser.parse_args()
 
     if args.prepare_deployment:
-        prepare_models_for_deployment(args.trained_dir, args.public_dir)
+        prepare_models_for_deployment(args.trained_dir, args.public_dir, args.quantize)
     elif args.model and args.output:
-        export_lstm_to_tfjs(args.model, args.output)
+        export_lstm_to_tfjs(args.model, args.output, args.quantize)
     else:
         parser.print_help()
 
@@ -2,13 +2,14 @@
 Stock prediction models package.
 """
 
-from .lstm_model import LSTMPredictor, create_lstm_model
+from .lstm_model import LSTMPredictor, create_lstm_model, create_lstm_model_legacy
 from .xgboost_model import XGBoostPredictor
 from .ensemble import EnsemblePredictor, PredictionResult
 
 __all__ = [
     'LSTMPredictor',
     'create_lstm_model',
+    'create_lstm_model_legacy',
     'XGBoostPredictor',
     'EnsemblePredictor',
     'PredictionResult',
@@ -4,12 +4,12 @@ Ensemble model combining LSTM and XGBoost predictions.
 
 import numpy as np
 from typing import Dict, Tuple, Optional
-from dataclasses import dataclass
-import json
+from dataclasses import dataclass, asdict
+import orjson
 import os
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class PredictionResult:
     """Result from ensemble prediction."""
     predicted_price: float
@@ -21,6 +21,13 @@ class PredictionResult:
     price_change: float
     price_change_percent: float
 
+    def to_dict(self, decimals: int = 2) -> Dict[str, object]:
+        """Serialize the result with numeric fields rounded for display."""
+        return {
+            key: round(float(value), decimals) if key != 'direction' else value
+            for key, value in asdict(self).items()
+        }
+
 
 class EnsemblePredictor:
     """
@@ -89,16 +96,65 @@ class EnsemblePredictor:
         )
 
         return PredictionResult(
-            predicted_price=round(ensemble_prediction, 2),
+            predicted_price=ensemble_prediction,
             direction=direction,
-            confidence=round(confidence, 2),
-            lstm_prediction=round(lstm_pred, 2),
-            xgboost_prediction=round(xgb_pred, 2),
-            current_price=round(current_price, 2),
-            price_change=round(price_change, 2),
-            price_change_percent=round(price_change_percent, 2)
+            confidence=confidence,
+            lstm_prediction=lstm_pred,
+            xgboost_prediction=xgb_pred,
+            current_price=current_price,
+            price_change=price_change,
+            price_change_percent=price_change_percent
         )
 
+    def predict_batch(
+        self,
+        lstm_predictions: np.ndarray,
+        xgboost_predictions: np.ndarray,
+        current_prices: np.ndarray,
+        historical_volatility: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Vectorized ensemble prediction over arrays of model outputs.
+
+        Args:
+            lstm_predictions: Array of LSTM predicted prices
+            xgboost_predictions: Array of XGBoost predicted prices
+            current_prices: Array of reference prices for each prediction
+            historical_volatility: Array (or scalar) of recent volatility (optional)
+
+        Returns:
+            Dict of arrays keyed like the PredictionResult fields
+        """
+        current_prices = np.asarray(current_prices, dtype=float)
+        lstm_pred = np.asarray(lstm_predictions, dtype=float) + self.lstm_bias_correction
+        xgb_pred = np.asarray(xgboost_predictions, dtype=float) + self.xgboost_bias_correction
+
+        ensemble_prediction = self.lstm_weight * lstm_pred + self.xgboost_weight * xgb_pred
+
+        price_change = ensemble_prediction - current_prices
+        price_change_percent = (price_change / current_prices) * 100
+
+        direction = np.where(
+            np.abs(price_change_percent) < self.neutral_threshold * 100,
+            'neutral',
+            np.where(price_change > 0, 'up', 'down')
+        )
+
+        confidence = self._calculate_confidence_batch(
+            lstm_pred, xgb_pred, current_prices, historical_volatility
+        )
+
+        return {
+            'predicted_price': ensemble_prediction,
+            'direction': direction,
+            'confidence': confidence,
+            'lstm_prediction': lstm_pred,
+            'xgboost_prediction': xgb_pred,
+            'current_price': current_prices,
+            'price_change': price_change,
+            'price_change_percent': price_change_percent
+        }
+
     def _calculate_confidence(
         self,
         lstm_pred: float,
@@ -140,6 +196,46 @@ class EnsemblePredictor:
         # Clamp to 0-100 range
         return max(0, min(100, confidence * 100))
 
+    def _calculate_confidence_batch(
+        self,
+        lstm_preds: np.ndarray,
+        xgb_preds: np.ndarray,
+        current_prices: np.ndarray,
+        volatility: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Vectorized equivalent of _calculate_confidence."""
+        # Model agreement
+        prediction_diff = np.abs(lstm_preds - xgb_preds)
+        avg_prediction = (lstm_preds + xgb_preds) / 2
+        positive = avg_prediction > 0
+        relative_diff = np.where(
+            positive, prediction_diff / np.where(positive, avg_prediction, 1), 0
+        )
+        agreement_score = np.clip(1 - relative_diff * 10, 0, None)
+
+        # Direction agreement bonus (sign via integer comparisons)
+        lstm_direction = (
+            (lstm_preds > current_prices).astype(np.int8) -
+            (lstm_preds < current_prices).astype(np.int8)
+        )
+        xgb_direction = (
+            (xgb_preds > current_prices).astype(np.int8) -
+            (xgb_preds < current_prices).astype(np.int8)
+        )
+        direction_bonus = np.where(lstm_direction == xgb_direction, 0.1, -0.1)
+
+        # Volatility adjustment
+        volatility_factor = 1.0
+        if volatility is not None:
+            volatility = np.asarray(volatility, dtype=float)
+            predicted_change = np.abs(avg_prediction - current_prices)
+            outside_range = (volatility > 0) & (predicted_change > volatility * current_prices * 2)
+            volatility_factor = np.where(outside_range, 0.8, 1.0)
+
+        confidence = (agreement_score + direction_bonus) * volatility_factor
+
+        return np.clip(confidence * 100, 0, 100)
+
     def calibrate(
         self,
         lstm_predictions: np.ndarray,
@@ -182,13 +278,15 @@ class EnsemblePredictor:
         }
 
         os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
-        with open(filepath, 'w') as f:
-            json.dump(config, f, indent=2)
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(
+                config, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+            ))
 
     def load_config(self, filepath: str):
         """Load ensemble configuration."""
-        with open(filepath, 'r') as f:
-            config = json.load(f)
+        with open(filepath, 'rb') as f:
+            config = orjson.loads(f.read())
 
         self.lstm_weight = config['lstm_weight']
         self.xgboost_weight = config['xgboost_weight']
@@ -211,46 +309,25 @@ def backtest_ensemble(
     """
     ensemble = EnsemblePredictor(lstm_weight=lstm_weight, xgboost_weight=1-lstm_weight)
 
-    correct_direction = 0
-    total_mae = 0
-    total_mse = 0
-
-    results = []
-
-    for i in range(len(actual_prices)):
-        current_price = actual_prices[i-1] if i > 0 else initial_price
-
-        result = ensemble.predict(
-            lstm_predictions[i],
-            xgboost_predictions[i],
-            current_price
-        )
-
-        actual_direction = 'up' if actual_prices[i] > current_price else 'down'
-        if abs(actual_prices[i] - current_price) / current_price < 0.005:
-            actual_direction = 'neutral'
-
-        if result.direction == actual_direction:
-            correct_direction += 1
+    actual_prices = np.asarray(actual_prices, dtype=float)
+    previous_prices = np.concatenate([[initial_price], actual_prices[:-1]])
 
-        error = abs(result.predicted_price - actual_prices[i])
-        total_mae += error
-        total_mse += error ** 2
+    result = ensemble.predict_batch(lstm_predictions, xgboost_predictions, previous_prices)
 
-        results.append({
-            'predicted': result.predicted_price,
-            'actual': actual_prices[i],
-            'error': error,
-            'direction_correct': result.direction == actual_direction
-        })
+    actual_change = actual_prices - previous_prices
+    actual_direction = np.where(
+        np.abs(actual_change) / previous_prices < ensemble.neutral_threshold,
+        'neutral',
+        np.where(actual_change > 0, 'up', 'down')
+    )
 
-    n = len(actual_prices)
+    errors = np.abs(result['predicted_price'] - actual_prices)
 
     return {
-        'direction_accuracy': correct_direction / n * 100,
-        'mae': total_mae / n,
-        'rmse': np.sqrt(total_mse / n),
-        'mape': total_mae / np.mean(actual_prices) * 100
+        'direction_accuracy': np.mean(result['direction'] == actual_direction) * 100,
+        'mae': np.mean(errors),
+        'rmse': np.sqrt(np.mean(errors ** 2)),
+        'mape': np.sum(errors) / np.mean(actual_prices) * 100
     }
 
 
@@ -265,13 +342,13 @@ if __name__ == "__main__":
     lstm_pred = 152.5
     xgb_pred = 151.8
 
-    result = ensemble.predict(lstm_pred, xgb_pred, current_price, volatility=0.02)
+    result = ensemble.predict(lstm_pred, xgb_pred, current_price, historical_volatility=0.02)
 
     print(f"\nCurrent Price: ${current_price}")
     print(f"LSTM Prediction: ${lstm_pred}")
     print(f"XGBoost Prediction: ${xgb_pred}")
     print(f"\nEnsemble Result:")
-    print(f"  Predicted Price: ${result.predicted_price}")
+    print(f"  Predicted Price: ${result.predicted_price:.2f}")
     print(f"  Direction: {result.direction}")
-    print(f"  Confidence: {result.confidence}%")
-    print(f"  Price Change: ${result.price_change} ({result.price_change_percent}%)")
+    print(f"  Confidence: {result.confidence:.2f}%")
+    print(f"  Price Change: ${result.price_change:.2f} ({result.price_change_percent:.2f}%)")
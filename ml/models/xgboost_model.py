@@ -4,11 +4,29 @@ XGBoost model for stock price prediction.
 
 import numpy as np
 import xgboost as xgb
-from sklearn.model_selection import GridSearchCV
+from sklearn.model_selection import KFold
 from typing import Optional, Dict, Any, Tuple
 import joblib
-import json
+import orjson
 import os
+import shutil
+from functools import lru_cache
+from itertools import product
+
+
+@lru_cache(maxsize=None)
+def detect_device() -> str:
+    """Return 'cuda' if XGBoost was built with CUDA and a GPU is visible, else 'cpu'."""
+    if not xgb.build_info().get('USE_CUDA', False):
+        return 'cpu'
+    try:
+        import cupy
+        return 'cuda' if cupy.cuda.runtime.getDeviceCount() > 0 else 'cpu'
+    except ImportError:
+        return 'cuda' if shutil.which('nvidia-smi') else 'cpu'
+    except Exception:
+        # cupy raises a CUDA runtime error when no device is present
+        return 'cpu'
 
 
 class XGBoostPredictor:
@@ -22,7 +40,8 @@ class XGBoostPredictor:
         subsample: float = 0.8,
         colsample_bytree: float = 0.8,
         min_child_weight: int = 1,
-        random_state: int = 42
+        random_state: int = 42,
+        device: Optional[str] = None
     ):
         self.params = {
             'n_estimators': n_estimators,
@@ -33,11 +52,13 @@ class XGBoostPredictor:
             'min_child_weight': min_child_weight,
             'random_state': random_state,
             'objective': 'reg:squarederror',
-            'tree_method': 'hist'
+            'tree_method': 'hist',
+            'device': device or detect_device()
         }
-        self.model: Optional[xgb.XGBRegressor] = None
+        self.model: Optional[xgb.Booster] = None
         self.feature_names: Optional[list] = None
         self.feature_importance: Optional[Dict[str, float]] = None
+        self._sorted_importance: Optional[list] = None
 
     def train(
         self,
@@ -49,28 +70,62 @@ class XGBoostPredictor:
         early_stopping_rounds: int = 10,
         verbose: bool = True
     ) -> 'XGBoostPredictor':
-        """Train the XGBoost model."""
-        self.feature_names = feature_names
+        """
+        Train the XGBoost model.
 
-        self.model = xgb.XGBRegressor(**self.params)
+        Uses the native training API on QuantileDMatrix inputs, which are
+        binned once up front and share the training bins with the
+        validation set. Stops early on the validation loss when given.
+        """
+        self.feature_names = feature_names
 
-        eval_set = [(X_train, y_train)]
+        dtrain = xgb.QuantileDMatrix(X_train, y_train, max_bin=256)
+        evals = [(dtrain, 'train')]
         if X_val is not None and y_val is not None:
-            eval_set.append((X_val, y_val))
-
-        self.model.fit(
-            X_train, y_train,
-            eval_set=eval_set,
-            verbose=verbose
+            dval = xgb.QuantileDMatrix(X_val, y_val, ref=dtrain)
+            evals.append((dval, 'val'))
+
+        booster = xgb.train(
+            self._booster_params(),
+            dtrain,
+            num_boost_round=self.params['n_estimators'],
+            evals=evals,
+            early_stopping_rounds=early_stopping_rounds if len(evals) > 1 else None,
+            verbose_eval=verbose
         )
 
+        # Keep only the trees up to the best validation round
+        if len(evals) > 1:
+            booster = booster[:booster.best_iteration + 1]
+        self.model = booster
+
         # Store feature importance
         if self.feature_names:
-            importance = self.model.feature_importances_
-            self.feature_importance = dict(zip(self.feature_names, importance))
+            self._set_feature_importance(self._gain_importance())
 
         return self
 
+    def _booster_params(self) -> Dict[str, Any]:
+        """Translate the sklearn-style params to native xgb.train params."""
+        params = {k: v for k, v in self.params.items() if k != 'n_estimators'}
+        params['seed'] = params.pop('random_state')
+        params['max_bin'] = 256
+        return params
+
+    def _gain_importance(self) -> Dict[str, float]:
+        """
+        Normalized average-gain (gain per split) importance per feature name.
+
+        Matches XGBRegressor.feature_importances_; features never used in a
+        split score zero.
+        """
+        scores = self.model.get_score(importance_type='gain')
+        importance = [scores.get(f"f{i}", 0.0) for i in range(len(self.feature_names))]
+        total = sum(importance)
+        if total > 0:
+            importance = [score / total for score in importance]
+        return dict(zip(self.feature_names, importance))
+
     def tune_hyperparameters(
         self,
         X_train: np.ndarray,
@@ -79,7 +134,14 @@ class XGBoostPredictor:
         cv: int = 5,
         verbose: int = 1
     ) -> Dict[str, Any]:
-        """Tune hyperparameters using grid search."""
+        """
+        Tune hyperparameters using a grid search over validation curves.
+
+        Each combination of the other parameters is trained once per fold,
+        at the largest n_estimators in the grid. Every smaller n_estimators
+        value is scored from the recorded per-round validation RMSE instead
+        of training a separate booster.
+        """
         if param_grid is None:
             param_grid = {
                 'max_depth': [3, 5, 7],
@@ -88,90 +150,149 @@ class XGBoostPredictor:
                 'subsample': [0.8, 0.9, 1.0]
             }
 
-        base_model = xgb.XGBRegressor(
-            objective='reg:squarederror',
-            random_state=self.params['random_state']
-        )
-
-        grid_search = GridSearchCV(
-            base_model,
-            param_grid,
-            cv=cv,
-            scoring='neg_mean_squared_error',
-            verbose=verbose,
-            n_jobs=-1
-        )
-
-        grid_search.fit(X_train, y_train)
-
-        # Update parameters with best found
-        self.params.update(grid_search.best_params_)
-        self.model = grid_search.best_estimator_
+        param_grid = dict(param_grid)
+        n_estimators_grid = sorted(param_grid.pop('n_estimators', [self.params['n_estimators']]))
+        rounds = np.asarray(n_estimators_grid) - 1
+
+        # Bin each fold once; every candidate reuses the same matrices
+        folds = []
+        for train_idx, val_idx in KFold(n_splits=cv).split(X_train):
+            dtrain = xgb.QuantileDMatrix(X_train[train_idx], y_train[train_idx], max_bin=256)
+            dval = xgb.QuantileDMatrix(X_train[val_idx], y_train[val_idx], ref=dtrain)
+            folds.append((dtrain, dval))
+
+        grid_names = list(param_grid)
+        candidates = []
+        fold_scores = []
+        for values in product(*param_grid.values()):
+            grid_params = dict(zip(grid_names, values))
+            params = {**self._booster_params(), **grid_params, 'eval_metric': 'rmse'}
+
+            # Validation MSE at each n_estimators value, per fold
+            mse = np.empty((cv, len(n_estimators_grid)))
+            for k, (dtrain, dval) in enumerate(folds):
+                evals_result = {}
+                xgb.train(
+                    params,
+                    dtrain,
+                    num_boost_round=n_estimators_grid[-1],
+                    evals=[(dval, 'val')],
+                    evals_result=evals_result,
+                    verbose_eval=False
+                )
+                mse[k] = np.asarray(evals_result['val']['rmse'])[rounds] ** 2
+
+            for j, n_estimators in enumerate(n_estimators_grid):
+                candidates.append({**grid_params, 'n_estimators': n_estimators})
+                fold_scores.append(mse[:, j])
+
+            if verbose:
+                print(f"  {grid_params}: best MSE {mse.mean(axis=0).min():.6f}")
+
+        # Scores follow the sklearn convention (negated MSE, higher is better)
+        test_scores = -np.asarray(fold_scores)
+        mean_scores = test_scores.mean(axis=1)
+        ranks = np.empty(len(candidates), dtype=int)
+        ranks[np.argsort(-mean_scores, kind='stable')] = np.arange(1, len(candidates) + 1)
+        best = int(np.argmax(mean_scores))
+
+        # Refit on the full training set with the best parameters
+        self.params.update(candidates[best])
+        self.train(X_train, y_train, feature_names=self.feature_names, verbose=False)
 
         return {
-            'best_params': grid_search.best_params_,
-            'best_score': -grid_search.best_score_,
-            'cv_results': grid_search.cv_results_
+            'best_params': candidates[best],
+            'best_score': -mean_scores[best],
+            'cv_results': {
+                'params': candidates,
+                'mean_test_score': mean_scores,
+                'std_test_score': test_scores.std(axis=1),
+                'rank_test_score': ranks
+            }
         }
 
     def predict(self, X: np.ndarray) -> np.ndarray:
         """Make predictions."""
         if self.model is None:
             raise ValueError("Model not trained. Call train() first.")
-        return self.model.predict(X)
+        # Predict on the booster directly, skipping DMatrix construction
+        return self.model.inplace_predict(X)
+
+    def _set_feature_importance(self, importance: Optional[Dict[str, float]]):
+        """Store feature importance, sorted once so lookups only slice."""
+        self.feature_importance = importance
+        self._sorted_importance = None
+        if importance is not None:
+            self._sorted_importance = sorted(
+                importance.items(),
+                key=lambda x: x[1],
+                reverse=True
+            )
 
     def get_feature_importance(self, top_n: int = 20) -> Dict[str, float]:
         """Get top N most important features."""
-        if self.feature_importance is None:
+        if self._sorted_importance is None:
             raise ValueError("No feature importance available.")
 
-        sorted_features = sorted(
-            self.feature_importance.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )
-        return dict(sorted_features[:top_n])
+        return dict(self._sorted_importance[:top_n])
 
     def save(self, filepath: str):
-        """Save model to file."""
+        """
+        Save model to file.
+
+        The booster is written in XGBoost's native UBJSON format (.ubj),
+        which is smaller and faster to load than a pickled wrapper.
+        """
         if self.model is None:
             raise ValueError("No model to save.")
 
         # Save the model
-        joblib.dump(self.model, filepath)
+        base_path = os.path.splitext(filepath)[0]
+        model_path = f"{base_path}.ubj"
+        self.model.save_model(model_path)
 
         # Save metadata
-        metadata_path = filepath.replace('.joblib', '_metadata.json')
+        metadata_path = f"{base_path}_metadata.json"
         metadata = {
             'params': self.params,
             'feature_names': self.feature_names,
             'feature_importance': self.feature_importance
         }
-        with open(metadata_path, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        with open(metadata_path, 'wb') as f:
+            f.write(orjson.dumps(
+                metadata, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+            ))
 
-        print(f"Model saved to {filepath}")
+        print(f"Model saved to {model_path}")
 
     def load(self, filepath: str):
-        """Load model from file."""
-        self.model = joblib.load(filepath)
+        """Load model from file, falling back to pickled .joblib models."""
+        base_path = os.path.splitext(filepath)[0]
+        model_path = f"{base_path}.ubj"
+        if os.path.exists(model_path):
+            self.model = xgb.Booster()
+            self.model.load_model(model_path)
+        else:
+            model_path = f"{base_path}.joblib"
+            self.model = joblib.load(model_path).get_booster()
 
         # Load metadata
-        metadata_path = filepath.replace('.joblib', '_metadata.json')
+        metadata_path = f"{base_path}_metadata.json"
         if os.path.exists(metadata_path):
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
+            with open(metadata_path, 'rb') as f:
+                metadata = orjson.loads(f.read())
                 self.params = metadata.get('params', self.params)
                 self.feature_names = metadata.get('feature_names')
-                self.feature_importance = metadata.get('feature_importance')
+                self._set_feature_importance(metadata.get('feature_importance'))
 
-        print(f"Model loaded from {filepath}")
+        print(f"Model loaded from {model_path}")
 
     def export_for_js(self, output_dir: str):
         """
         Export model parameters for JavaScript implementation.
-        Note: XGBoost models need to be converted to a custom format
-        or use ONNX for JavaScript inference.
+
+        Besides the booster JSON, writes an ONNX graph (xgboost_model.onnx)
+        for onnxruntime-web when onnxmltools is installed.
         """
         if self.model is None:
             raise ValueError("No model to export.")
@@ -187,15 +308,41 @@ class XGBoostPredictor:
         }
 
         config_path = os.path.join(output_dir, 'xgboost_config.json')
-        with open(config_path, 'w') as f:
-            json.dump(model_config, f, indent=2)
+        with open(config_path, 'wb') as f:
+            f.write(orjson.dumps(
+                model_config, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+            ))
 
         # Save the booster as JSON (can be loaded by xgboost in various languages)
         booster_path = os.path.join(output_dir, 'xgboost_model.json')
         self.model.save_model(booster_path)
 
+        self._export_onnx(os.path.join(output_dir, 'xgboost_model.onnx'))
+
         print(f"XGBoost model exported to {output_dir}")
 
+    def _export_onnx(self, onnx_path: str) -> bool:
+        """Convert the trees to an ONNX TreeEnsembleRegressor graph."""
+        try:
+            import onnxmltools
+            from onnxmltools.convert.common.data_types import FloatTensorType
+        except ImportError:
+            print("onnxmltools not installed; skipping ONNX export")
+            return False
+
+        # The converter only understands the default f0..fN feature names
+        booster = self.model.copy()
+        booster.feature_names = None
+        n_features = booster.num_features()
+
+        onnx_model = onnxmltools.convert_xgboost(
+            booster,
+            initial_types=[('input', FloatTensorType([None, n_features]))]
+        )
+        with open(onnx_path, 'wb') as f:
+            f.write(onnx_model.SerializeToString())
+        return True
+
 
 if __name__ == "__main__":
     # Test model creation and training
@@ -5,14 +5,20 @@ Main training script for stock prediction models.
 import os
 import sys
 import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import numpy as np
+import tensorflow as tf
 from sklearn.model_selection import train_test_split
-import json
+from sklearn.metrics import mean_absolute_error
+import orjson
 from datetime import datetime
+from typing import Optional, Dict, Any
 
 from data_preprocessing import DataPipeline, fetch_stock_data
-from models.lstm_model import LSTMPredictor
-from models.xgboost_model import XGBoostPredictor
+from models.lstm_model import LSTMPredictor, MIXED_PRECISION
+from models.xgboost_model import XGBoostPredictor, detect_device
 from models.ensemble import EnsemblePredictor, backtest_ensemble
 
 
@@ -22,7 +28,8 @@ def train_models(
     sequence_length: int = 60,
     test_size: float = 0.2,
     lstm_epochs: int = 100,
-    output_dir: str = "trained_models"
+    output_dir: str = "trained_models",
+    use_cache: bool = True
 ):
     """
     Train both LSTM and XGBoost models for a given stock.
@@ -34,6 +41,7 @@ def train_models(
         test_size: Fraction of data for testing
         lstm_epochs: Number of training epochs for LSTM
         output_dir: Directory to save trained models
+        use_cache: Reuse locally cached price history when available
     """
     print(f"\n{'='*60}")
     print(f"Training models for {symbol}")
@@ -45,7 +53,7 @@ def train_models(
 
     # Fetch and preprocess data
     print("\n[1/5] Fetching and preprocessing data...")
-    df = fetch_stock_data(symbol, period)
+    df = fetch_stock_data(symbol, period, use_cache=use_cache)
     print(f"  Fetched {len(df)} data points")
 
     pipeline = DataPipeline()
@@ -61,7 +69,10 @@ def train_models(
     # Use same test indices for both models
     n_test = int(len(X_lstm) * test_size)
 
-    X_lstm_train, X_lstm_test = X_lstm[:-n_test], X_lstm[-n_test:]
+    # Convert the sequences to a tensor once; training, validation and
+    # prediction all consume these slices without further host copies
+    X_lstm_tf = tf.constant(X_lstm, dtype=tf.float32)
+    X_lstm_train, X_lstm_test = X_lstm_tf[:-n_test], X_lstm_tf[-n_test:]
     y_lstm_train, y_lstm_test = y_lstm[:-n_test], y_lstm[-n_test:]
 
     X_xgb_train, X_xgb_test = X_xgb[:-n_test], X_xgb[-n_test:]
@@ -81,30 +92,34 @@ def train_models(
     )
 
     lstm_predictions = lstm.predict(X_lstm_test)
-    lstm_mae = np.mean(np.abs(lstm_predictions - y_lstm_test))
+    lstm_mae = mean_absolute_error(y_lstm_test, lstm_predictions)
     print(f"  LSTM Test MAE (normalized): {lstm_mae:.6f}")
 
     # Train XGBoost
     print("\n[4/5] Training XGBoost model...")
     xgb = XGBoostPredictor()
+    # Early stopping picks the number of trees, so it watches the most
+    # recent slice of the training data; the test split stays held out
+    n_val = int(len(X_xgb_train) * test_size)
     xgb.train(
-        X_xgb_train, y_xgb_train,
-        X_xgb_test, y_xgb_test,
+        X_xgb_train[:-n_val], y_xgb_train[:-n_val],
+        X_xgb_train[-n_val:], y_xgb_train[-n_val:],
         feature_names=data['xgboost']['feature_names']
     )
 
     xgb_predictions = xgb.predict(X_xgb_test)
-    xgb_mae = np.mean(np.abs(xgb_predictions - y_xgb_test))
+    xgb_mae = mean_absolute_error(y_xgb_test, xgb_predictions)
     print(f"  XGBoost Test MAE (normalized): {xgb_mae:.6f}")
 
     # Calibrate ensemble
     print("\n[5/5] Calibrating ensemble...")
     ensemble = EnsemblePredictor()
 
-    # Backtest with actual prices
-    y_lstm_test_prices = pipeline.inverse_scale_price(y_lstm_test)
-    lstm_pred_prices = pipeline.inverse_scale_price(lstm_predictions)
-    xgb_pred_prices = pipeline.inverse_scale_price(xgb_predictions)
+    # Backtest with actual prices, unscaled into one preallocated buffer
+    price_buffer = np.empty((3, n_test))
+    y_lstm_test_prices = pipeline.inverse_scale_price(y_lstm_test, out=price_buffer[0])
+    lstm_pred_prices = pipeline.inverse_scale_price(lstm_predictions, out=price_buffer[1])
+    xgb_pred_prices = pipeline.inverse_scale_price(xgb_predictions, out=price_buffer[2])
 
     metrics = backtest_ensemble(
         lstm_pred_prices,
@@ -131,7 +146,7 @@ def train_models(
     lstm.save_for_tfjs(os.path.join(model_dir, 'lstm_tfjs'))
 
     # Save XGBoost model
-    xgb_path = os.path.join(model_dir, 'xgboost_model.joblib')
+    xgb_path = os.path.join(model_dir, 'xgboost_model.ubj')
     xgb.save(xgb_path)
     xgb.export_for_js(os.path.join(model_dir, 'xgboost_js'))
 
@@ -140,9 +155,7 @@ def train_models(
     ensemble.save_config(ensemble_path)
 
     # Save scaler and preprocessing info
-    import joblib
-    scaler_path = os.path.join(model_dir, 'feature_scaler.joblib')
-    joblib.dump(pipeline.feature_scaler, scaler_path)
+    pipeline.save_scaler(model_dir)
 
     preprocessing_config = {
         'feature_columns': pipeline.feature_columns,
@@ -153,8 +166,10 @@ def train_models(
     }
 
     config_path = os.path.join(model_dir, 'preprocessing_config.json')
-    with open(config_path, 'w') as f:
-        json.dump(preprocessing_config, f, indent=2)
+    with open(config_path, 'wb') as f:
+        f.write(orjson.dumps(
+            preprocessing_config, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+        ))
 
     print(f"\nModels saved to {model_dir}")
     print(f"{'='*60}")
@@ -168,6 +183,23 @@ def train_models(
     }
 
 
+def _train_one(symbol: str, **kwargs) -> Optional[Dict[str, Any]]:
+    """Train a single symbol in a worker process, returning its metrics."""
+    try:
+        return train_models(symbol=symbol, **kwargs)['metrics']
+    except Exception as e:
+        print(f"Error training {symbol}: {e}")
+        return None
+
+
+def _default_workers(n_symbols: int) -> int:
+    """Half the cores, or a single worker when models train on a GPU."""
+    if MIXED_PRECISION or detect_device() == 'cuda':
+        # Concurrent processes would each claim the whole device
+        return 1
+    return max(1, min(n_symbols, (os.cpu_count() or 2) // 2))
+
+
 def main():
     parser = argparse.ArgumentParser(description='Train stock prediction models')
     parser.add_argument('--symbol', type=str, default='AAPL', help='Stock symbol')
@@ -175,22 +207,36 @@ def main():
     parser.add_argument('--epochs', type=int, default=100, help='LSTM training epochs')
     parser.add_argument('--output', type=str, default='trained_models', help='Output directory')
     parser.add_argument('--symbols', type=str, nargs='+', help='Multiple symbols to train')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always download fresh price history')
+    parser.add_argument('--workers', type=int,
+                        help='Symbols to train in parallel (default: half the CPU '
+                             'cores, 1 on GPU; raise it on GPUs running NVIDIA MPS)')
 
     args = parser.parse_args()
 
     symbols = args.symbols if args.symbols else [args.symbol]
+    workers = args.workers or _default_workers(len(symbols))
+
+    train_one = partial(
+        _train_one,
+        period=args.period,
+        lstm_epochs=args.epochs,
+        output_dir=args.output,
+        use_cache=not args.no_cache
+    )
 
-    for symbol in symbols:
-        try:
-            train_models(
-                symbol=symbol,
-                period=args.period,
-                lstm_epochs=args.epochs,
-                output_dir=args.output
-            )
-        except Exception as e:
-            print(f"Error training {symbol}: {e}")
-            continue
+    if workers <= 1 or len(symbols) == 1:
+        for symbol in symbols:
+            train_one(symbol)
+        return
+
+    # Spawn fresh interpreters; TensorFlow's runtime does not survive a fork
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(symbols)),
+        mp_context=multiprocessing.get_context('spawn')
+    ) as executor:
+        list(executor.map(train_one, symbols))
 
 
 if __name__ == "__main__":
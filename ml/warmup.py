@@ -0,0 +1,36 @@
+"""
+Populate the numba on-disk cache before training.
+
+Run once after installing dependencies so that worker processes load the
+compiled indicator kernels from cache instead of compiling them on first use.
+"""
+
+import importlib
+import time
+import numpy as np
+
+
+def warmup():
+    """Compile (or load from cache) and call every jitted function once."""
+    start = time.perf_counter()
+
+    # The kernels have explicit signatures, so importing them compiles them
+    indicators = importlib.import_module('_indicators_numba')
+    if not indicators.NUMBA_AVAILABLE:
+        print("numba is not installed; indicators use the ta fallback.")
+        return
+
+    n = 250
+    close = np.linspace(100.0, 110.0, n)
+    volume = np.full(n, 1e6)
+    out = np.empty((n, len(indicators.INDICATOR_COLUMNS)))
+    state = np.zeros(indicators.STATE_SIZE)
+    closes = np.zeros(indicators.CLOSE_HISTORY)
+    volumes = np.zeros(indicators.VOLUME_HISTORY)
+    indicators.compute_all(close, volume, out, state, closes, volumes)
+
+    print(f"Numba indicator cache ready ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    warmup()